@@ -4,20 +4,74 @@ from __future__ import annotations
 
 from datetime import timedelta
 
+import homeassistant.helpers.config_validation as cv
+import voluptuous as vol
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import CONF_ENTITY_ID, CONF_TYPE
+from homeassistant.const import CONF_ATTRIBUTE, CONF_ENTITY_ID, CONF_TYPE
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.device import (
     async_remove_stale_devices_links_keep_entity_device,
 )
 from homeassistant.helpers.template import Template
+from homeassistant.helpers.typing import ConfigType
 
-from .const import CONF_DURATION, CONF_END, CONF_START, CONF_TYPE_MAX, PLATFORMS
+from .budget import DATA_MEMORY_BUDGET, HistoryMathMemoryBudget
+from .cache import DATA_RESULT_CACHE, HistoryMathResultCache
+from .const import (
+    CONF_BINS,
+    CONF_DURATION,
+    CONF_END,
+    CONF_GROUP_BY_VALUE,
+    CONF_MAX_CONCURRENT_LOADS,
+    CONF_MEMORY_BUDGET,
+    CONF_READ_POOL_SIZE,
+    CONF_START,
+    CONF_TIME_WEIGHTED,
+    CONF_TYPE_HISTOGRAM,
+    CONF_TYPE_MAX,
+    DEFAULT_MAX_CONCURRENT_LOADS,
+    DEFAULT_MEMORY_BUDGET,
+    DEFAULT_READ_POOL_SIZE,
+    DOMAIN,
+    PLATFORMS,
+)
 from .coordinator import HistoryMathUpdateCoordinator
 from .data import HistoryMath
+from .helpers import parse_bins
+from .loader import DATA_LOADER, HistoryMathLoader
+from .reader import DATA_READER, HistoryMathReader
 
 type HistoryMathConfigEntry = ConfigEntry[HistoryMathUpdateCoordinator]
 
+DOMAIN_SCHEMA = vol.Schema(
+    {
+        vol.Optional(
+            CONF_MEMORY_BUDGET, default=DEFAULT_MEMORY_BUDGET
+        ): cv.positive_int,
+        vol.Optional(
+            CONF_MAX_CONCURRENT_LOADS, default=DEFAULT_MAX_CONCURRENT_LOADS
+        ): cv.positive_int,
+        vol.Optional(
+            CONF_READ_POOL_SIZE, default=DEFAULT_READ_POOL_SIZE
+        ): cv.positive_int,
+    }
+)
+CONFIG_SCHEMA = vol.Schema({DOMAIN: DOMAIN_SCHEMA}, extra=vol.ALLOW_EXTRA)
+
+
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    """Set up the integration wide History Math resources."""
+    conf = config.get(DOMAIN) or DOMAIN_SCHEMA({})
+    hass.data[DATA_MEMORY_BUDGET] = HistoryMathMemoryBudget(
+        conf[CONF_MEMORY_BUDGET] * 1024 * 1024
+    )
+    hass.data[DATA_LOADER] = HistoryMathLoader(hass, conf[CONF_MAX_CONCURRENT_LOADS])
+    hass.data[DATA_READER] = HistoryMathReader(hass, conf[CONF_READ_POOL_SIZE])
+    result_cache = HistoryMathResultCache(hass)
+    await result_cache.async_load()
+    hass.data[DATA_RESULT_CACHE] = result_cache
+    return True
+
 
 async def async_setup_entry(hass: HomeAssistant, entry: HistoryMathConfigEntry) -> bool:
     """Set up History stats from a config entry."""
@@ -26,17 +80,26 @@ async def async_setup_entry(hass: HomeAssistant, entry: HistoryMathConfigEntry)
     end: str | None = entry.options.get(CONF_END)
     sensor_type: str = entry.options.get(CONF_TYPE, CONF_TYPE_MAX)
     duration: dict | None = entry.options.get(CONF_DURATION)
+    attribute: str | None = entry.options.get(CONF_ATTRIBUTE)
+    bins: list[float] | None = (
+        parse_bins(entry.options[CONF_BINS])
+        if sensor_type == CONF_TYPE_HISTOGRAM
+        else None
+    )
 
     history_math = HistoryMath(
         hass,
-        entity_id,
+        [entity_id],
         Template(start, hass) if start else None,
         Template(end, hass) if end else None,
         timedelta(**duration) if duration else None,
         sensor_type,
+        attribute,
+        CONF_GROUP_BY_VALUE,
+        bins,
+        time_weighted=entry.options.get(CONF_TIME_WEIGHTED, False),
     )
     coordinator = HistoryMathUpdateCoordinator(hass, history_math, entry.title)
-    await coordinator.async_config_entry_first_refresh()
     entry.runtime_data = coordinator
 
     async_remove_stale_devices_links_keep_entity_device(
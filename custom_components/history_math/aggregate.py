@@ -0,0 +1,106 @@
+"""Running aggregate of the values in a history_math buffer."""
+
+from __future__ import annotations
+
+import math
+from collections import Counter
+from heapq import heapify, heappop, heappush
+
+
+class HistoryAggregate:
+    """
+    The count, total, minimum and maximum of the numeric values in a buffer.
+
+    Values are added and removed as states enter and leave the buffer, so an
+    update costs as much as the states that changed. Removed values stay in
+    the heaps until they reach the top, or until they outnumber the values
+    still held and the heaps are compacted.
+    """
+
+    def __init__(self) -> None:
+        """Init the aggregate."""
+        self.count = 0
+        self.total = 0.0
+        self._minimum: list[float] = []
+        self._maximum: list[float] = []
+        self._removed_minimum: Counter[float] = Counter()
+        self._removed_maximum: Counter[float] = Counter()
+        self._removed = 0
+
+    def reset(self) -> None:
+        """Empty the aggregate."""
+        self.count = 0
+        self.total = 0.0
+        self._minimum = []
+        self._maximum = []
+        self._removed_minimum = Counter()
+        self._removed_maximum = Counter()
+        self._removed = 0
+
+    @staticmethod
+    def _value(state: str) -> float | None:
+        """Return the value of a state, if it is numeric."""
+        try:
+            value = float(state)
+        except ValueError:
+            return None
+        # NaN never compares equal, so it could not be found again to remove
+        return None if math.isnan(value) else value
+
+    def add(self, state: str) -> None:
+        """Add the value of a state."""
+        if (value := self._value(state)) is None:
+            return
+        self.count += 1
+        self.total += value
+        heappush(self._minimum, value)
+        heappush(self._maximum, -value)
+
+    def remove(self, state: str) -> None:
+        """Remove the value of a state that was added."""
+        if (value := self._value(state)) is None:
+            return
+        self.count -= 1
+        self.total -= value
+        self._removed_minimum[value] += 1
+        self._removed_maximum[-value] += 1
+        self._removed += 1
+        if self._removed > self.count:
+            self._compact()
+
+    @property
+    def minimum(self) -> float:
+        """Return the smallest value."""
+        return self._top(self._minimum, self._removed_minimum)
+
+    @property
+    def maximum(self) -> float:
+        """Return the largest value."""
+        return -self._top(self._maximum, self._removed_maximum)
+
+    @staticmethod
+    def _top(heap: list[float], removed: Counter[float]) -> float:
+        """Return the top of a heap, dropping removed values on the way."""
+        while removed[heap[0]]:
+            removed[heap[0]] -= 1
+            heappop(heap)
+        return heap[0]
+
+    def _compact(self) -> None:
+        """Drop every removed value from the heaps."""
+        for heap, removed in (
+            (self._minimum, self._removed_minimum),
+            (self._maximum, self._removed_maximum),
+        ):
+            kept = []
+            for value in heap:
+                if removed[value]:
+                    removed[value] -= 1
+                else:
+                    kept.append(value)
+            heapify(kept)
+            heap[:] = kept
+            removed.clear()
+        self._removed = 0
+        # Adding and removing leaves rounding errors in the total
+        self.total = math.fsum(self._minimum)
@@ -0,0 +1,126 @@
+"""Integration wide memory budget for the history_math buffers."""
+
+from __future__ import annotations
+
+import logging
+from typing import TYPE_CHECKING
+
+from homeassistant.core import CALLBACK_TYPE, callback
+from homeassistant.util.hass_dict import HassKey
+
+from .const import DOMAIN
+
+if TYPE_CHECKING:
+    from .data import HistoryMath
+
+_LOGGER = logging.getLogger(__name__)
+
+DATA_MEMORY_BUDGET: HassKey[HistoryMathMemoryBudget] = HassKey(
+    f"{DOMAIN}_memory_budget"
+)
+
+# Rough size of a buffered state: the slotted HistoryState, its state string,
+# the float timestamp, the list slot pointing at it and, for statistics kept
+# incrementally, its value in the minimum and maximum heaps.
+ESTIMATED_STATE_SIZE = 176
+
+# Degraded buffers are restored once they fit under this fraction of the budget
+RESTORE_FRACTION = 0.5
+
+
+class HistoryMathMemoryBudget:
+    """Account for and limit the memory held by all history buffers."""
+
+    def __init__(self, max_bytes: int) -> None:
+        """Init the memory budget."""
+        self._max_bytes = max_bytes
+        self._sensors: dict[HistoryMath, str] = {}
+        # The number of states each degraded buffer held before degrading
+        self._degraded: dict[HistoryMath, int] = {}
+        self._exhausted = False
+
+    @callback
+    def async_register(self, name: str, history_math: HistoryMath) -> CALLBACK_TYPE:
+        """Start accounting for a history buffer and return a callback to stop."""
+        self._sensors[history_math] = name
+
+        @callback
+        def unregister() -> None:
+            """Stop accounting for the history buffer."""
+            self._sensors.pop(history_math, None)
+            self._degraded.pop(history_math, None)
+
+        self.async_enforce()
+        return unregister
+
+    @callback
+    def async_usage(self) -> dict[str, int]:
+        """Return the estimated memory used per sensor in bytes."""
+        return {
+            name: history_math.buffered_states * ESTIMATED_STATE_SIZE
+            for history_math, name in self._sensors.items()
+        }
+
+    @callback
+    def async_enforce(self) -> None:
+        """Degrade the largest buffers until the total fits in the budget."""
+        if _LOGGER.isEnabledFor(logging.DEBUG):
+            _LOGGER.debug("Estimated memory use in bytes: %s", self.async_usage())
+        total = (
+            sum(history_math.buffered_states for history_math in self._sensors)
+            * ESTIMATED_STATE_SIZE
+        )
+        if total <= self._max_bytes:
+            self._exhausted = False
+            self._async_restore(total)
+            return
+
+        # Largest buffers first, they give back the most for the least sensors
+        for history_math in sorted(
+            self._sensors, key=lambda item: item.buffered_states, reverse=True
+        ):
+            while total > self._max_bytes:
+                before = history_math.buffered_states
+                if (mode := history_math.degrade()) is None:
+                    break
+                self._degraded.setdefault(history_math, before)
+                freed = (before - history_math.buffered_states) * ESTIMATED_STATE_SIZE
+                total -= freed
+                _LOGGER.warning(
+                    "Memory budget of %d bytes exceeded, degraded %s to %s"
+                    " (freed %d bytes)",
+                    self._max_bytes,
+                    self._sensors[history_math],
+                    mode,
+                    freed,
+                )
+            if total <= self._max_bytes:
+                self._exhausted = False
+                return
+
+        if not self._exhausted:
+            # Only log once until usage drops back under the budget
+            self._exhausted = True
+            _LOGGER.warning(
+                "Memory budget of %d bytes still exceeded (%d bytes in use)",
+                self._max_bytes,
+                total,
+            )
+
+    @callback
+    def _async_restore(self, total: int) -> None:
+        """Restore the smallest degraded buffers that fit well within the budget."""
+        for history_math, states in sorted(
+            self._degraded.items(), key=lambda item: item[1]
+        ):
+            size = states * ESTIMATED_STATE_SIZE
+            if total + size > self._max_bytes * RESTORE_FRACTION:
+                return
+            history_math.restore()
+            del self._degraded[history_math]
+            total += size
+            _LOGGER.info(
+                "Memory budget of %d bytes no longer exceeded, restored %s",
+                self._max_bytes,
+                self._sensors[history_math],
+            )
@@ -0,0 +1,84 @@
+"""Persistent cache of the results for completed periods."""
+
+from __future__ import annotations
+
+import logging
+from typing import TypedDict
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+from homeassistant.util.hass_dict import HassKey
+
+from .const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+DATA_RESULT_CACHE: HassKey[HistoryMathResultCache] = HassKey(f"{DOMAIN}_result_cache")
+
+STORAGE_KEY = f"{DOMAIN}.results"
+STORAGE_VERSION = 1
+SAVE_DELAY = 30
+
+# Oldest results are dropped past this many, enough for many sensors
+MAX_RESULTS = 2048
+
+
+class StoredResults(TypedDict):
+    """The stored results."""
+
+    results: dict[str, float]
+
+
+class HistoryMathResultCache:
+    """Remember the results of periods that are completely in the past."""
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Init the result cache."""
+        self._store: Store[StoredResults] = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+        self._results: dict[str, float] = {}
+
+    async def async_load(self) -> None:
+        """Load the stored results."""
+        if (stored := await self._store.async_load()) is not None:
+            self._results = stored["results"]
+        _LOGGER.debug("Loaded %d cached results", len(self._results))
+
+    @staticmethod
+    def key(
+        entity_ids: list[str],
+        attribute: str | None,
+        sensor_type: str,
+        group_by: str,
+        period: tuple[float, float],
+    ) -> str:
+        """Return the key of the result for a statistic over a period."""
+        return "|".join(
+            (
+                ",".join(entity_ids),
+                attribute or "",
+                sensor_type,
+                group_by,
+                str(period[0]),
+                str(period[1]),
+            )
+        )
+
+    @callback
+    def async_get(self, key: str) -> float | None:
+        """Return a cached result, if any."""
+        return self._results.get(key)
+
+    @callback
+    def async_set(self, key: str, value: float) -> None:
+        """Cache a result and schedule it to be stored."""
+        if self._results.get(key) == value:
+            return
+        self._results[key] = value
+        while len(self._results) > MAX_RESULTS:
+            del self._results[next(iter(self._results))]
+        self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+
+    @callback
+    def _data_to_save(self) -> StoredResults:
+        """Return the results to store."""
+        return {"results": self._results}
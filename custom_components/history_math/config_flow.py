@@ -7,6 +7,7 @@ from typing import Any, cast
 
 import voluptuous as vol
 from homeassistant.const import (
+    CONF_ATTRIBUTE,
     CONF_ENTITY_ID,
     CONF_NAME,
     CONF_TYPE,
@@ -19,6 +20,7 @@ from homeassistant.helpers.schema_config_entry_flow import (
     SchemaFlowFormStep,
 )
 from homeassistant.helpers.selector import (
+    BooleanSelector,
     DurationSelector,
     DurationSelectorConfig,
     EntitySelector,
@@ -30,15 +32,19 @@ from homeassistant.helpers.selector import (
 )
 
 from .const import (
+    CONF_BINS,
     CONF_DURATION,
     CONF_END,
     CONF_PERIOD_KEYS,
     CONF_START,
+    CONF_TIME_WEIGHTED,
+    CONF_TYPE_HISTOGRAM,
     CONF_TYPE_KEYS,
     CONF_TYPE_MAX,
     DEFAULT_NAME,
     DOMAIN,
 )
+from .helpers import parse_bins
 
 
 async def validate_options(
@@ -48,7 +54,14 @@ async def validate_options(
     if sum(param in user_input for param in CONF_PERIOD_KEYS) != 2:
         raise SchemaFlowError("only_two_keys_allowed")
 
-    handler.parent_handler._async_abort_entries_match({**handler.options, **user_input})  # noqa: SLF001
+    options = {**handler.options, **user_input}
+    if options.get(CONF_TYPE) == CONF_TYPE_HISTOGRAM:
+        try:
+            parse_bins(options.get(CONF_BINS, ""))
+        except ValueError as ex:
+            raise SchemaFlowError("invalid_bins") from ex
+
+    handler.parent_handler._async_abort_entries_match(options)  # noqa: SLF001
 
     return user_input
 
@@ -57,6 +70,7 @@ DATA_SCHEMA_SETUP = vol.Schema(
     {
         vol.Required(CONF_NAME, default=DEFAULT_NAME): TextSelector(),
         vol.Required(CONF_ENTITY_ID): EntitySelector(),
+        vol.Optional(CONF_ATTRIBUTE): TextSelector(),
         vol.Required(CONF_TYPE, default=CONF_TYPE_MAX): SelectSelector(
             SelectSelectorConfig(
                 options=CONF_TYPE_KEYS,
@@ -74,12 +88,15 @@ DATA_SCHEMA_OPTIONS = vol.Schema(
             DurationSelectorConfig(enable_day=True, allow_negative=False)
         ),
         vol.Optional(CONF_UNIT_OF_MEASUREMENT): TextSelector(),
+        vol.Optional(CONF_BINS): TextSelector(),
+        vol.Optional(CONF_TIME_WEIGHTED, default=False): BooleanSelector(),
     }
 )
 
 DATA_SCHEMA_OPTIONS_STANDALONE = vol.Schema(
     {
         vol.Required(CONF_ENTITY_ID): EntitySelector(),
+        vol.Optional(CONF_ATTRIBUTE): TextSelector(),
         vol.Required(CONF_TYPE, default=CONF_TYPE_MAX): SelectSelector(
             SelectSelectorConfig(
                 options=CONF_TYPE_KEYS,
@@ -93,6 +110,8 @@ DATA_SCHEMA_OPTIONS_STANDALONE = vol.Schema(
             DurationSelectorConfig(enable_day=True, allow_negative=False)
         ),
         vol.Optional(CONF_UNIT_OF_MEASUREMENT): TextSelector(),
+        vol.Optional(CONF_BINS): TextSelector(),
+        vol.Optional(CONF_TIME_WEIGHTED, default=False): BooleanSelector(),
     }
 )
 
@@ -11,6 +11,7 @@ CONF_DURATION = "duration"
 CONF_PERIOD_KEYS = [CONF_START, CONF_END, CONF_DURATION]
 
 CONF_TYPE_CHANGE = "change"
+CONF_TYPE_HISTOGRAM = "histogram"
 CONF_TYPE_LAST = "last"
 CONF_TYPE_MAX = "max"
 CONF_TYPE_MEAN = "mean"
@@ -19,6 +20,7 @@ CONF_TYPE_MIN = "min"
 CONF_TYPE_RANGE = "range"
 CONF_TYPE_KEYS = [
     CONF_TYPE_CHANGE,
+    CONF_TYPE_HISTOGRAM,
     CONF_TYPE_LAST,
     CONF_TYPE_MAX,
     CONF_TYPE_MEAN,
@@ -27,4 +29,22 @@ CONF_TYPE_KEYS = [
     CONF_TYPE_RANGE,
 ]
 
+CONF_GROUP_BY = "group_by"
+CONF_GROUP_BY_VALUE = "value"
+CONF_GROUP_BY_ENTITY = "entity"
+CONF_GROUP_BY_KEYS = [CONF_GROUP_BY_VALUE, CONF_GROUP_BY_ENTITY]
+
+CONF_BINS = "bins"
+CONF_TIME_WEIGHTED = "time_weighted"
+
 DEFAULT_NAME = "unnamed calculation"
+
+CONF_MEMORY_BUDGET = "memory_budget"
+DEFAULT_MEMORY_BUDGET = 64  # MiB
+CONF_MAX_CONCURRENT_LOADS = "max_concurrent_loads"
+DEFAULT_MAX_CONCURRENT_LOADS = 2
+CONF_READ_POOL_SIZE = "read_pool_size"
+DEFAULT_READ_POOL_SIZE = 0
+
+ATTR_LOADING = "loading"
+ATTR_BINS = "bins"
@@ -2,10 +2,13 @@
 
 from __future__ import annotations
 
+import asyncio
 import logging
+from collections import deque
 from datetime import timedelta
 from typing import Any
 
+from homeassistant.const import EVENT_STATE_CHANGED
 from homeassistant.core import (
     CALLBACK_TYPE,
     Event,
@@ -18,13 +21,19 @@ from homeassistant.helpers.event import async_track_state_change_event
 from homeassistant.helpers.start import async_at_start
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
 
+from .budget import DATA_MEMORY_BUDGET
 from .data import HistoryMath, HistoryMathState
+from .loader import DATA_LOADER
 
 _LOGGER = logging.getLogger(__name__)
 
 
 UPDATE_INTERVAL = timedelta(minutes=1)
 
+# Changes kept to replay after an initial load, past this the history is
+# loaded again instead
+MAX_PENDING_EVENTS = 1000
+
 
 class HistoryMathUpdateCoordinator(DataUpdateCoordinator[HistoryMathState]):
     """DataUpdateCoordinator for history stats."""
@@ -40,6 +49,18 @@ class HistoryMathUpdateCoordinator(DataUpdateCoordinator[HistoryMathState]):
         self._subscriber_count = 0
         self._at_start_listener: CALLBACK_TYPE | None = None
         self._track_events_listener: CALLBACK_TYPE | None = None
+        self._memory_budget = hass.data[DATA_MEMORY_BUDGET]
+        self._budget_listener: CALLBACK_TYPE | None = None
+        self._loader = hass.data[DATA_LOADER]
+        self._initial_load_pending = True
+        self._initial_load_lock = asyncio.Lock()
+        self._initial_load_task: asyncio.Task[None] | None = None
+        self._pending_events: deque[Event[EventStateChangedData]] = deque(
+            maxlen=MAX_PENDING_EVENTS
+        )
+        self._pending_events_dropped = False
+        self._loading_history = False
+        self._visible = True
         super().__init__(
             hass,
             _LOGGER,
@@ -47,6 +68,29 @@ class HistoryMathUpdateCoordinator(DataUpdateCoordinator[HistoryMathState]):
             update_interval=UPDATE_INTERVAL,
         )
 
+    @property
+    def loading(self) -> bool:
+        """Return if the history has not been loaded yet."""
+        return self._initial_load_pending
+
+    @callback
+    def async_schedule_initial_load(self, *, visible: bool) -> CALLBACK_TYPE:
+        """Queue the initial load of the history and return a callback to cancel it."""
+        if self._initial_load_pending:
+            self._visible = visible
+            self._initial_load_task = self.hass.async_create_background_task(
+                self.async_refresh(), f"{self.name} initial history load"
+            )
+        return self._async_cancel_initial_load
+
+    @callback
+    def _async_cancel_initial_load(self) -> None:
+        """Stop waiting to load the history of a sensor that was removed."""
+        if self._initial_load_task is not None:
+            self._initial_load_task.cancel()
+            self._initial_load_task = None
+        self._pending_events.clear()
+
     @callback
     def async_setup_state_listener(self) -> CALLBACK_TYPE:
         """Set up listeners and return a callback to cancel them."""
@@ -73,10 +117,16 @@ class HistoryMathUpdateCoordinator(DataUpdateCoordinator[HistoryMathState]):
         if self._at_start_listener:
             self._at_start_listener()
             self._at_start_listener = None
+        if self._budget_listener:
+            self._budget_listener()
+            self._budget_listener = None
 
     @callback
     def _async_add_listener(self) -> None:
         """Add a listener to start tracking state changes after start."""
+        self._budget_listener = self._memory_budget.async_register(
+            self.name, self._history_math
+        )
         self._at_start_listener = async_at_start(
             self.hass, self._async_add_events_listener
         )
@@ -85,19 +135,88 @@ class HistoryMathUpdateCoordinator(DataUpdateCoordinator[HistoryMathState]):
     def _async_add_events_listener(self, *_: Any) -> None:
         """Handle hass starting and start tracking events."""
         self._at_start_listener = None
+        if self._history_math.has_globs:
+            # Entities matching a glob may be added at any time
+            self._track_events_listener = self.hass.bus.async_listen(
+                EVENT_STATE_CHANGED,
+                self._async_update_from_event,
+                event_filter=self._async_event_filter,
+            )
+            return
         self._track_events_listener = async_track_state_change_event(
-            self.hass, [self._history_math.entity_id], self._async_update_from_event
+            self.hass,
+            self._history_math.entity_ids,
+            self._async_update_from_event,
         )
 
+    @callback
+    def _async_event_filter(self, event_data: EventStateChangedData) -> bool:
+        """Return if a state change is for one of the tracked entities."""
+        return self._history_math.async_matches(event_data["entity_id"])
+
     async def _async_update_from_event(
         self, event: Event[EventStateChangedData]
     ) -> None:
         """Process an update from an event."""
-        self.async_set_updated_data(await self._history_math.async_update(event))
+        if self._initial_load_pending:
+            if self._loading_history:
+                # Changes the recorder has not committed may be missing from
+                # the load, so they are replayed once it has finished
+                if len(self._pending_events) == self._pending_events.maxlen:
+                    self._pending_events_dropped = True
+                self._pending_events.append(event)
+            return
+        data = await self._history_math.async_update(event)
+        self._memory_budget.async_enforce()
+        self.async_set_updated_data(data)
 
     async def _async_update_data(self) -> HistoryMathState:
         """Fetch update the history stats state."""
         try:
-            return await self._history_math.async_update(None)
+            if self._initial_load_pending:
+                data = await self._async_initial_load()
+            else:
+                data = await self._history_math.async_update(None)
         except (TemplateError, TypeError, ValueError) as ex:
             raise UpdateFailed(ex) from ex
+        self._memory_budget.async_enforce()
+        return data
+
+    async def _async_initial_load(self) -> HistoryMathState:
+        """Load the history for the first time when the loader allows it."""
+        async with self._initial_load_lock:
+            if not self._initial_load_pending:
+                # Another refresh finished the load while this one waited
+                return await self._history_math.async_update(None)
+            async with self._loader.async_load_slot(
+                self.name,
+                self._history_math.async_window_length(),
+                visible=self._visible,
+            ):
+                data = await self._async_load_history()
+                if self._pending_events_dropped:
+                    # Too many changes to replay, so read them from the recorder
+                    self._history_math.invalidate()
+                    data = await self._async_load_history()
+            # Changes that were also loaded from the recorder are skipped
+            while self._pending_events:
+                data = await self._history_math.async_update(
+                    self._pending_events.popleft()
+                )
+            self._initial_load_pending = False
+            self._initial_load_task = None
+            return data
+
+    async def _async_load_history(self) -> HistoryMathState:
+        """Load the history, queueing the changes received meanwhile."""
+        self._pending_events.clear()
+        self._pending_events_dropped = False
+        self._loading_history = True
+        try:
+            return await self._history_math.async_update(None)
+        except Exception:
+            # A failed load is retried from scratch by the next refresh
+            self._pending_events.clear()
+            raise
+        finally:
+            self._loading_history = False
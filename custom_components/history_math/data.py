@@ -3,18 +3,28 @@
 from __future__ import annotations
 
 import datetime
+import fnmatch
+import heapq
 import logging
 import math
-from dataclasses import dataclass
+import re
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, field, replace
+from enum import StrEnum
+from itertools import islice
+from operator import attrgetter
 from statistics import fmean, median
 
 import homeassistant.util.dt as dt_util
-from homeassistant.components.recorder import get_instance, history
-from homeassistant.core import Event, EventStateChangedData, HomeAssistant, State
+from homeassistant.const import STATE_UNKNOWN
+from homeassistant.core import Event, EventStateChangedData, HomeAssistant, callback
+from homeassistant.exceptions import TemplateError
 from homeassistant.helpers.template import Template
 
 from custom_components.history_math.const import (
+    CONF_GROUP_BY_ENTITY,
     CONF_TYPE_CHANGE,
+    CONF_TYPE_HISTOGRAM,
     CONF_TYPE_LAST,
     CONF_TYPE_MAX,
     CONF_TYPE_MEAN,
@@ -23,12 +33,38 @@ from custom_components.history_math.const import (
     CONF_TYPE_RANGE,
 )
 
-from .helpers import async_calculate_period, floored_timestamp
+from .aggregate import HistoryAggregate
+from .cache import DATA_RESULT_CACHE
+from .helpers import async_calculate_period, floored_timestamp, is_glob
+from .histogram import HistoryHistogram
+from .queries import attribute_changes_during_period, state_changes_during_period
+from .reader import DATA_READER
 
 MIN_TIME_UTC = datetime.datetime.min.replace(tzinfo=dt_util.UTC)
 
+# Largest stride a downsampled buffer may use before falling back to on demand
+MAX_DOWNSAMPLE_STRIDE = 8
+
+# Buffers drop their expired head once it is this fraction of the buffer
+COMPACT_FRACTION = 0.5
+
+# Seconds after a period ends before its result is cached, so that the recorder
+# has committed every state in the period
+RESULT_CACHE_DELAY = 60
+
 _LOGGER = logging.getLogger(__name__)
 
+_LAST_CHANGED = attrgetter("last_changed")
+
+# Statistics kept up to date as states enter and leave the buffer
+INCREMENTAL_TYPES = {
+    CONF_TYPE_CHANGE,
+    CONF_TYPE_MAX,
+    CONF_TYPE_MEAN,
+    CONF_TYPE_MIN,
+    CONF_TYPE_RANGE,
+}
+
 
 @dataclass
 class HistoryMathState:
@@ -36,14 +72,48 @@ class HistoryMathState:
 
     calc_value: float | None
     period: tuple[datetime.datetime, datetime.datetime]
+    bins: dict[str, float] | None = None
 
 
-@dataclass
+@dataclass(slots=True)
 class HistoryState:
     """A minimal state to avoid holding on to State objects."""
 
     state: str
     last_changed: float
+    entity_id: str
+
+
+@dataclass(slots=True)
+class HistorySummary:
+    """A running aggregate of states that are no longer held in the buffer."""
+
+    count: int = 0
+    total: float = 0.0
+    minimum: float = math.inf
+    maximum: float = -math.inf
+    last: float | None = None
+    latest: dict[str, float] = field(default_factory=dict)
+
+    def add(self, value: float, entity_id: str) -> None:
+        """Fold a value into the summary."""
+        self.count += 1
+        self.total += value
+        self.minimum = min(self.minimum, value)
+        self.maximum = max(self.maximum, value)
+        self.last = value
+        # Keep the most recently updated entity last
+        self.latest.pop(entity_id, None)
+        self.latest[entity_id] = value
+
+
+class BufferMode(StrEnum):
+    """How much of the history is held in memory."""
+
+    RAW = "raw"
+    SUMMARY = "summary"
+    DOWNSAMPLED = "downsampled"
+    ON_DEMAND = "on_demand"
 
 
 class HistoryMath:
@@ -52,28 +122,282 @@ class HistoryMath:
     def __init__(
         self,
         hass: HomeAssistant,
-        entity_id: str,
+        entity_ids: list[str],
         start: Template | None,
         end: Template | None,
         duration: datetime.timedelta | None,
         sensor_type: str,
+        attribute: str | None,
+        group_by: str,
+        bins: list[float] | None,
+        *,
+        time_weighted: bool,
     ) -> None:
         """Init the history stats manager."""
         self.hass = hass
-        self.entity_id = entity_id
+        self.entity_ids = entity_ids
+        self._exact_entity_ids = {
+            entity_id for entity_id in entity_ids if not is_glob(entity_id)
+        }
+        self._glob_pattern = (
+            re.compile("|".join(map(fnmatch.translate, globs)))
+            if (globs := [entity_id for entity_id in entity_ids if is_glob(entity_id)])
+            else None
+        )
+        self.attribute = attribute
+        self._group_by = group_by
+        self._reader = hass.data[DATA_READER]
+        self._result_cache = hass.data[DATA_RESULT_CACHE]
         self._period = (MIN_TIME_UTC, MIN_TIME_UTC)
         self._state: HistoryMathState = HistoryMathState(None, self._period)
+        # Sorted by last_changed, states before _head have expired
         self._history_current_period: list[HistoryState] = []
+        self._head = 0
         self._previous_run_before_start = False
+        self._history_released = False
         self._duration = duration
         self._start = start
         self._end = end
         self._sensor_type = sensor_type
+        self._buffer_mode = BufferMode.RAW
+        self._summary = HistorySummary()
+        self._downsample_stride = 1
+        self._downsample_skipped = 0
+        # Set once the start of the period is seen to move within the period
+        self._window_slides = start is None
+        self._update_timestamp = 0.0
+        self._aggregate = (
+            HistoryAggregate()
+            if sensor_type in INCREMENTAL_TYPES and group_by != CONF_GROUP_BY_ENTITY
+            else None
+        )
+        self._histogram = (
+            HistoryHistogram(bins, time_weighted=time_weighted)
+            if sensor_type == CONF_TYPE_HISTOGRAM and bins
+            else None
+        )
+
+    @property
+    def buffered_states(self) -> int:
+        """Return the number of states held in memory."""
+        return len(self._history_current_period) - self._head
+
+    @callback
+    def async_window_length(self) -> datetime.timedelta | None:
+        """Return the length of the period, if it can be worked out."""
+        if self._duration is not None:
+            return self._duration
+        try:
+            start, end = async_calculate_period(self._duration, self._start, self._end)
+        except (TemplateError, TypeError, ValueError):
+            return None
+        return end - start
+
+    @property
+    def has_globs(self) -> bool:
+        """Return if any of the entity ids is a glob pattern."""
+        return self._glob_pattern is not None
+
+    @callback
+    def async_matches(self, entity_id: str) -> bool:
+        """Return if an entity id is one of the entity ids or matches a glob."""
+        return entity_id in self._exact_entity_ids or (
+            self._glob_pattern is not None
+            and self._glob_pattern.match(entity_id) is not None
+        )
+
+    @callback
+    def async_resolve_entity_ids(self) -> list[str]:
+        """Return the entity ids, expanding any glob patterns."""
+        entity_ids = dict.fromkeys(
+            entity_id for entity_id in self.entity_ids if not is_glob(entity_id)
+        )
+        if self._glob_pattern is not None:
+            entity_ids.update(
+                dict.fromkeys(
+                    entity_id
+                    for entity_id in self.hass.states.async_entity_ids()
+                    if self._glob_pattern.match(entity_id)
+                )
+            )
+        return list(entity_ids)
+
+    def degrade(self) -> BufferMode | None:
+        """Hold less history in memory, returning the new mode if any."""
+        if self._buffer_mode in {BufferMode.SUMMARY, BufferMode.ON_DEMAND}:
+            return None
+        if (
+            not self._window_slides
+            and self._histogram is None
+            and (
+                self._sensor_type != CONF_TYPE_MEDIAN
+                or self._group_by == CONF_GROUP_BY_ENTITY
+            )
+        ):
+            # Every other statistic can be computed from a running summary.
+            # A summary cannot drop the states leaving a sliding window
+            # though, nor place the late states a histogram needs.
+            self._buffer_mode = BufferMode.SUMMARY
+            self._fold_into_summary(floored_timestamp(dt_util.utcnow()))
+            return self._buffer_mode
+
+        if (
+            self._histogram is not None
+            or self._downsample_stride >= MAX_DOWNSAMPLE_STRIDE
+        ):
+            # Stop holding the values at all, as a summarized or downsampled
+            # histogram would count the wrong states
+            self._buffer_mode = BufferMode.ON_DEMAND
+            # Queried history is used whole, so on demand values are exact
+            self._downsample_stride = 1
+            self._downsample_skipped = 0
+            self._reset_history()
+            return self._buffer_mode
+        self._buffer_mode = BufferMode.DOWNSAMPLED
+        self._downsample_stride *= 2
+        self._history_current_period = self._history_current_period[self._head :: 2]
+        self._head = 0
+        self._rebuild_aggregate()
+        return self._buffer_mode
+
+    def invalidate(self) -> None:
+        """Reload the period from the recorder on the next update."""
+        self._history_released = True
+
+    def restore(self) -> None:
+        """Hold the raw history in memory again, from the next update."""
+        self._buffer_mode = BufferMode.RAW
+        self._downsample_stride = 1
+        self._downsample_skipped = 0
+        self._reset_history()
+        # What was held is incomplete, so the next update reloads the period
+        self._history_released = True
+
+    def _reset_history(self) -> None:
+        """Drop all the history held in memory."""
+        self._history_current_period = []
+        self._head = 0
+        self._summary = HistorySummary()
+        if self._aggregate is not None:
+            self._aggregate.reset()
+        if self._histogram is not None:
+            self._histogram.reset()
+
+    def _rebuild_aggregate(self) -> None:
+        """Build the aggregate from the whole buffer, after a load or downsampling."""
+        if self._aggregate is None:
+            return
+        self._aggregate.reset()
+        for history_state in islice(self._history_current_period, self._head, None):
+            self._aggregate.add(history_state.state)
+
+    def _now_index(self, now_timestamp: float) -> int:
+        """Return the index of the first state in the future."""
+        # A state is in the future when its floored timestamp is after now
+        return bisect_left(
+            self._history_current_period,
+            now_timestamp + 1,
+            lo=self._head,
+            key=_LAST_CHANGED,
+        )
+
+    def _fold_into_summary(self, now_timestamp: float) -> None:
+        """Move the buffered states that are not in the future into the summary."""
+        now_index = self._now_index(now_timestamp)
+        for history_state in islice(
+            self._history_current_period, self._head, now_index
+        ):
+            try:
+                self._summary.add(float(history_state.state), history_state.entity_id)
+            except ValueError:
+                # eat the exception and skip the item
+                pass
+        del self._history_current_period[:now_index]
+        self._head = 0
+        if self._aggregate is not None:
+            # Only the summary is used from now on
+            self._aggregate.reset()
+
+    def _expire_states(self, start_timestamp: float) -> None:
+        """Expire the states before the start of the period."""
+        buffer = self._history_current_period
+        start_index = bisect_right(
+            buffer, start_timestamp, lo=self._head, key=_LAST_CHANGED
+        )
+        # The last expiring state of each entity is its state at the start
+        states_at_start: dict[str, HistoryState] = {}
+        for history_state in islice(buffer, self._head, start_index):
+            states_at_start[history_state.entity_id] = history_state
+        if self._aggregate is not None:
+            for history_state in islice(buffer, self._head, start_index):
+                if states_at_start[history_state.entity_id] is not history_state:
+                    self._aggregate.remove(history_state.state)
+        if self._histogram is not None:
+            self._histogram.expire(buffer[self._head : start_index], start_timestamp)
+        self._head = start_index - len(states_at_start)
+        for index, history_state in enumerate(states_at_start.values(), self._head):
+            history_state.last_changed = start_timestamp
+            buffer[index] = history_state
+        if self._head > len(buffer) * COMPACT_FRACTION:
+            # Dropping the head is linear, so only do it once it has grown
+            del buffer[: self._head]
+            self._head = 0
+
+    def _is_buffered(self, history_state: HistoryState) -> bool:
+        """Return if the same change of the entity is already in the buffer."""
+        buffer = self._history_current_period
+        index = bisect_left(
+            buffer, history_state.last_changed, lo=self._head, key=_LAST_CHANGED
+        )
+        while (
+            index < len(buffer)
+            and buffer[index].last_changed == history_state.last_changed
+        ):
+            if buffer[index].entity_id == history_state.entity_id:
+                return True
+            index += 1
+        return False
+
+    def _append_state(self, history_state: HistoryState, now_timestamp: float) -> None:
+        """Add a new state to the buffer according to the buffer mode."""
+        buffer = self._history_current_period
+        if (
+            len(buffer) > self._head
+            and history_state.last_changed <= buffer[-1].last_changed
+            and self._is_buffered(history_state)
+        ):
+            # Replayed changes may also have been loaded from the recorder
+            return
+        if self._buffer_mode is BufferMode.DOWNSAMPLED:
+            self._downsample_skipped += 1
+            if self._downsample_skipped < self._downsample_stride:
+                return
+            self._downsample_skipped = 0
+        if len(buffer) == self._head or (
+            history_state.last_changed >= buffer[-1].last_changed
+        ):
+            buffer.append(history_state)
+            index = len(buffer) - 1
+        else:
+            # Late events are put in order
+            index = bisect_right(
+                buffer, history_state.last_changed, lo=self._head, key=_LAST_CHANGED
+            )
+            buffer.insert(index, history_state)
+        if self._histogram is not None:
+            self._histogram.insert(buffer, index, self._head)
+        if self._buffer_mode is BufferMode.SUMMARY:
+            self._fold_into_summary(now_timestamp)
+        elif self._aggregate is not None:
+            self._aggregate.add(history_state.state)
 
     async def async_update(
         self, event: Event[EventStateChangedData] | None
     ) -> HistoryMathState:
         """Update the stats at a given time."""
+        # Taken before the templates are rendered, so an end of now() is
+        # never before it
+        utc_now = dt_util.utcnow()
         # Get previous values of start and end
         previous_period_start, previous_period_end = self._period
         # Parse templates
@@ -99,26 +423,59 @@ class HistoryMath:
         current_period_end_timestamp = floored_timestamp(current_period_end)
         previous_period_start_timestamp = floored_timestamp(previous_period_start)
         previous_period_end_timestamp = floored_timestamp(previous_period_end)
-        utc_now = dt_util.utcnow()
         now_timestamp = floored_timestamp(utc_now)
 
         if current_period_start_timestamp > now_timestamp:
             # History cannot tell the future
-            self._history_current_period = []
+            self._reset_history()
             self._previous_run_before_start = True
             self._state = HistoryMathState(None, self._period)
             return self._state
+
+        result_key = self._async_result_key(
+            current_period_start_timestamp, current_period_end_timestamp, now_timestamp
+        )
+        if (
+            result_key is not None
+            and (cached_value := self._result_cache.async_get(result_key)) is not None
+        ):
+            # A completed period cannot change, so its history is not needed
+            self._reset_history()
+            self._history_released = True
+            self._state = HistoryMathState(cached_value, self._period)
+            return self._state
+
+        start_moved = current_period_start_timestamp != previous_period_start_timestamp
+        can_slide = self._can_slide(
+            previous_period_start_timestamp,
+            previous_period_end_timestamp,
+            current_period_start_timestamp,
+            now_timestamp,
+        )
+
+        if self._buffer_mode is BufferMode.ON_DEMAND:
+            # Nothing is held in memory, so only query on the periodic refresh
+            if event is None:
+                await self._async_update_on_demand(
+                    result_key,
+                    current_period_start_timestamp,
+                    current_period_end_timestamp,
+                    now_timestamp,
+                )
+            return self._state
         #
         # We avoid querying the database if the below did NOT happen:
         #
         # - The previous run happened before the start time
-        # - The start time changed
+        # - The history was released after using a cached result
+        # - The start time moved without the window being able to slide
         # - The period shrank in size
         # - The previous period ended before now
         #
         if (
             not self._previous_run_before_start
-            and current_period_start_timestamp == previous_period_start_timestamp
+            and not self._history_released
+            and (not start_moved or can_slide)
             and (
                 current_period_end_timestamp == previous_period_end_timestamp
                 or (
@@ -127,64 +484,235 @@ class HistoryMath:
                 )
             )
         ):
+            if start_moved:
+                # Slide the window instead of reloading it
+                self._expire_states(current_period_start_timestamp)
             new_data = False
-            if event and (new_state := event.data["new_state"]) is not None:
+            if event and (history_state := self._history_state_from_event(event)):
                 if (
                     current_period_start_timestamp
-                    <= floored_timestamp(new_state.last_changed)
+                    <= math.floor(history_state.last_changed)
                     <= current_period_end_timestamp
                 ):
-                    self._history_current_period.append(
-                        HistoryState(
-                            new_state.state, new_state.last_changed.timestamp()
-                        )
-                    )
+                    self._append_state(history_state, now_timestamp)
                     new_data = True
-            if not new_data and current_period_end_timestamp < now_timestamp:
+            if (
+                not new_data
+                and not start_moved
+                and current_period_end_timestamp < now_timestamp
+            ):
                 # If period has not changed and current time after the period end...
                 # Don't compute anything as the value cannot have changed
+                if current_period_end_timestamp == previous_period_end_timestamp:
+                    self._async_cache_result(
+                        result_key, current_period_end_timestamp, now_timestamp
+                    )
                 return self._state
         else:
             await self._async_history_from_db(
                 current_period_start_timestamp, current_period_end_timestamp
             )
             self._previous_run_before_start = False
+            if self._buffer_mode is BufferMode.SUMMARY:
+                self._fold_into_summary(now_timestamp)
+
+        if self._histogram is not None:
+            self._state = self._async_histogram_state(
+                min(now_timestamp, current_period_end_timestamp)
+            )
+            return self._state
 
         calc_value = self._async_compute_value(now_timestamp)
         self._state = HistoryMathState(calc_value, self._period)
+        self._async_cache_result(
+            result_key, current_period_end_timestamp, now_timestamp
+        )
         return self._state
 
+    @callback
+    def _async_result_key(
+        self,
+        current_period_start_timestamp: float,
+        current_period_end_timestamp: float,
+        now_timestamp: float,
+    ) -> str | None:
+        """Return the key of the cached result, if the period has ended."""
+        if current_period_end_timestamp >= now_timestamp:
+            return None
+        return self._result_cache.key(
+            # Globs may match other entities later, so key on the matches
+            sorted(self.async_resolve_entity_ids()),
+            self.attribute,
+            self._sensor_type,
+            self._group_by,
+            (current_period_start_timestamp, current_period_end_timestamp),
+        )
+
+    def _can_slide(
+        self,
+        previous_period_start_timestamp: float,
+        previous_period_end_timestamp: float,
+        current_period_start_timestamp: float,
+        now_timestamp: float,
+    ) -> bool:
+        """Return if the window can slide to its new start without a reload."""
+        previous_update_timestamp, self._update_timestamp = (
+            self._update_timestamp,
+            now_timestamp,
+        )
+        if not (
+            previous_period_start_timestamp
+            < current_period_start_timestamp
+            < previous_period_end_timestamp
+        ):
+            # The start did not move, moved back or began a new period
+            return False
+        self._window_slides = True
+        if self._buffer_mode is BufferMode.SUMMARY:
+            # A summary cannot slide, so reload and degrade the way sliding
+            # windows do
+            self._buffer_mode = BufferMode.RAW
+            self._reset_history()
+            self._history_released = True
+            self.degrade()
+            return False
+        # Changes after the previous end were not kept, unless that end had
+        # not passed yet
+        return previous_period_end_timestamp >= previous_update_timestamp
+
+    @callback
+    def _async_histogram_state(self, until_timestamp: float) -> HistoryMathState:
+        """Return the state of a histogram, with the weight of each bin."""
+        assert self._histogram is not None
+        weights = self._histogram.weights(until_timestamp)
+        if not any(weights):
+            return HistoryMathState(None, self._period)
+        return HistoryMathState(
+            round(sum(weights), 3),
+            self._period,
+            {
+                label: round(weight, 3)
+                for label, weight in zip(self._histogram.labels, weights, strict=True)
+            },
+        )
+
+    async def _async_update_on_demand(
+        self,
+        result_key: str | None,
+        current_period_start_timestamp: float,
+        current_period_end_timestamp: float,
+        now_timestamp: float,
+    ) -> None:
+        """Update the stats from the database without keeping the history."""
+        await self._async_history_from_db(
+            current_period_start_timestamp, current_period_end_timestamp
+        )
+        self._previous_run_before_start = False
+        if self._histogram is not None:
+            self._state = self._async_histogram_state(
+                min(now_timestamp, current_period_end_timestamp)
+            )
+        else:
+            self._state = HistoryMathState(
+                self._async_compute_value(now_timestamp), self._period
+            )
+        self._reset_history()
+        self._async_cache_result(
+            result_key, current_period_end_timestamp, now_timestamp
+        )
+
+    @callback
+    def _async_cache_result(
+        self,
+        result_key: str | None,
+        period_end_timestamp: float,
+        now_timestamp: float,
+    ) -> None:
+        """Cache the result of a completed period, if it is exact and has no bins."""
+        if (
+            result_key is None
+            or self._state.calc_value is None
+            or self._histogram is not None
+            # Values from a downsampled history are approximate
+            or self._downsample_stride != 1
+            or period_end_timestamp + RESULT_CACHE_DELAY >= now_timestamp
+        ):
+            return
+        self._result_cache.async_set(result_key, self._state.calc_value)
+
+    def _history_state_from_event(
+        self, event: Event[EventStateChangedData]
+    ) -> HistoryState | None:
+        """Return the state to record for an event, if any."""
+        if (new_state := event.data["new_state"]) is None:
+            return None
+        if self.attribute is None:
+            return HistoryState(
+                new_state.state,
+                new_state.last_changed.timestamp(),
+                new_state.entity_id,
+            )
+        value = new_state.attributes.get(self.attribute)
+        if (
+            old_state := event.data["old_state"]
+        ) is not None and value == old_state.attributes.get(self.attribute):
+            # Only the state or other attributes changed
+            return None
+        return HistoryState(
+            STATE_UNKNOWN if value is None else str(value),
+            new_state.last_updated.timestamp(),
+            new_state.entity_id,
+        )
+
     async def _async_history_from_db(
         self,
         current_period_start_timestamp: float,
         current_period_end_timestamp: float,
     ) -> None:
         """Update history data for the current period from the database."""
-        instance = get_instance(self.hass)
-        states = await instance.async_add_executor_job(
-            self._state_changes_during_period,
-            current_period_start_timestamp,
-            current_period_end_timestamp,
-        )
-        self._history_current_period = [
-            HistoryState(state.state, state.last_changed.timestamp())
-            for state in states
-        ]
-
-    def _state_changes_during_period(
-        self, start_ts: float, end_ts: float
-    ) -> list[State]:
-        """Return state changes during a period."""
-        start = dt_util.utc_from_timestamp(start_ts)
-        end = dt_util.utc_from_timestamp(end_ts)
-        return history.state_changes_during_period(
-            self.hass,
-            start,
-            end,
-            self.entity_id,
-            include_start_time_state=True,
-            no_attributes=True,
-        ).get(self.entity_id, [])
+        entity_ids = self.async_resolve_entity_ids()
+        if self.attribute is not None:
+            changes = await self._reader.async_add_executor_job(
+                attribute_changes_during_period,
+                self.hass,
+                current_period_start_timestamp,
+                current_period_end_timestamp,
+                entity_ids,
+                self.attribute,
+            )
+        else:
+            changes = await self._reader.async_add_executor_job(
+                state_changes_during_period,
+                self.hass,
+                current_period_start_timestamp,
+                current_period_end_timestamp,
+                entity_ids,
+            )
+        # Each entity's changes are already in time order, so a k-way merge
+        # gives a single time ordered buffer
+        merged = heapq.merge(
+            *(
+                [
+                    HistoryState(state, last_changed, entity_id)
+                    for state, last_changed in entity_changes
+                ]
+                for entity_id, entity_changes in changes.items()
+            ),
+            key=_LAST_CHANGED,
+        )
+        self._history_current_period = list(
+            islice(merged, None, None, self._downsample_stride)
+        )
+        self._head = 0
+        self._summary = HistorySummary()
+        self._downsample_skipped = 0
+        self._history_released = False
+        self._rebuild_aggregate()
+        if self._histogram is not None:
+            # Only a load builds the bins from the whole buffer
+            self._histogram.reset()
+            for history_state in self._history_current_period:
+                self._histogram.append(history_state)
 
     def _async_compute_value(
         self,
@@ -194,19 +722,85 @@ class HistoryMath:
         # state_changes_during_period is called with include_start_time_state=True
         # which is the default and always provides the state at the start
         # of the period
+        now_index = self._now_index(now_timestamp)
+        if self._buffer_mode is not BufferMode.SUMMARY:
+            if self._aggregate is not None and now_index == len(
+                self._history_current_period
+            ):
+                # Without states in the future the aggregate covers the period
+                return self._aggregate_value(self._aggregate)
+            if (
+                self._sensor_type == CONF_TYPE_LAST
+                and self._group_by != CONF_GROUP_BY_ENTITY
+            ):
+                return self._last_value(now_index)
+
+        summary = (
+            replace(self._summary, latest=dict(self._summary.latest))
+            if self._buffer_mode is BufferMode.SUMMARY
+            else None
+        )
         values: list[float] = []
+        latest: dict[str, float] = {}
 
         # Collect values for calculations - this is done manually because it gets very
         #  clunky to use filter when passing extra arguments.
-        for history_state in self._history_current_period:
-            # Shouldn't count states that are in the future
-            if math.floor(history_state.last_changed) <= now_timestamp:
-                try:
-                    values.append(float(history_state.state))
-                except ValueError:
-                    # eat the exception and skip the item
-                    pass
+        # Shouldn't count states that are in the future
+        for history_state in islice(
+            self._history_current_period, self._head, now_index
+        ):
+            try:
+                value = float(history_state.state)
+            except ValueError:
+                # eat the exception and skip the item
+                continue
+            if summary is not None:
+                summary.add(value, history_state.entity_id)
+            elif self._group_by == CONF_GROUP_BY_ENTITY:
+                # Keep the most recently updated entity last
+                latest.pop(history_state.entity_id, None)
+                latest[history_state.entity_id] = value
+            else:
+                values.append(value)
+
+        if self._group_by == CONF_GROUP_BY_ENTITY:
+            # Aggregate the last value of each entity
+            return self._calculate_value(
+                list((summary.latest if summary is not None else latest).values())
+            )
+        if summary is not None:
+            return self._summary_value(summary)
+        return self._calculate_value(values)
+
+    def _last_value(self, now_index: int) -> float | None:
+        """Return the last numeric value before now."""
+        for index in range(now_index - 1, self._head - 1, -1):
+            try:
+                return float(self._history_current_period[index].state)
+            except ValueError:
+                continue
+        return None
+
+    def _aggregate_value(self, aggregate: HistoryAggregate) -> float | None:
+        """Compute the value for the period from the running aggregate."""
+        if aggregate.count == 0:
+            return None
+
+        calc_value = None
 
+        if self._sensor_type == CONF_TYPE_MAX:
+            calc_value = aggregate.maximum
+        elif self._sensor_type == CONF_TYPE_MIN:
+            calc_value = aggregate.minimum
+        elif self._sensor_type == CONF_TYPE_MEAN:
+            calc_value = aggregate.total / aggregate.count
+        elif self._sensor_type in {CONF_TYPE_RANGE, CONF_TYPE_CHANGE}:
+            calc_value = aggregate.maximum - aggregate.minimum
+
+        return calc_value
+
+    def _calculate_value(self, values: list[float]) -> float | None:
+        """Compute the value for a list of values."""
         if not values:
             return None
 
@@ -226,3 +820,23 @@ class HistoryMath:
             calc_value = max(values) - min(values)
 
         return calc_value
+
+    def _summary_value(self, summary: HistorySummary) -> float | None:
+        """Compute the value for the period from a summary."""
+        if summary.count == 0:
+            return None
+
+        calc_value = None
+
+        if self._sensor_type == CONF_TYPE_LAST:
+            calc_value = summary.last
+        elif self._sensor_type == CONF_TYPE_MAX:
+            calc_value = summary.maximum
+        elif self._sensor_type == CONF_TYPE_MIN:
+            calc_value = summary.minimum
+        elif self._sensor_type == CONF_TYPE_MEAN:
+            calc_value = summary.total / summary.count
+        elif self._sensor_type in {CONF_TYPE_RANGE, CONF_TYPE_CHANGE}:
+            calc_value = summary.maximum - summary.minimum
+
+        return calc_value
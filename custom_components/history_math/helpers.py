@@ -5,6 +5,7 @@ from __future__ import annotations
 import datetime
 import logging
 import math
+from itertools import pairwise
 
 import homeassistant.util.dt as dt_util
 from homeassistant.core import callback
@@ -17,6 +18,8 @@ _LOGGER = logging.getLogger(__name__)
 DURATION_START = "start"
 DURATION_END = "end"
 
+GLOB_CHARACTERS = "*?["
+
 
 @callback
 def async_calculate_period(
@@ -76,3 +79,20 @@ def async_calculate_period(
 def floored_timestamp(incoming_dt: datetime.datetime) -> float:
     """Calculate the floored value of a timestamp."""
     return math.floor(dt_util.as_timestamp(incoming_dt))
+
+
+def is_glob(entity_id: str) -> bool:
+    """Return if an entity id is a glob pattern."""
+    return any(char in entity_id for char in GLOB_CHARACTERS)
+
+
+def parse_bins(bins: str | list[float]) -> list[float]:
+    """Parse histogram bin edges, given as a list or comma separated."""
+    if isinstance(bins, str):
+        bins = [float(edge) for edge in bins.split(",") if edge.strip()]
+    edges = [float(edge) for edge in bins]
+    if not edges:
+        raise ValueError("At least one bin edge is needed")
+    if any(low >= high for low, high in pairwise(edges)):
+        raise ValueError("Bin edges must be in increasing order")
+    return edges
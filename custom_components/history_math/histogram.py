@@ -0,0 +1,131 @@
+"""Incrementally maintained histogram of the history_math values."""
+
+from __future__ import annotations
+
+from bisect import bisect_right
+from itertools import pairwise
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .data import HistoryState
+
+SECONDS_PER_HOUR = 3600
+
+
+class HistoryHistogram:
+    """
+    A histogram of the values in the period.
+
+    Bins are adjusted as states are added and expired, never rebuilt from the
+    whole history. When time weighted, the bins hold the time each value
+    lasted until the next state of its entity. The latest state of each
+    entity is still open and only counted up to now when read.
+    """
+
+    def __init__(self, edges: list[float], *, time_weighted: bool) -> None:
+        """Init the histogram."""
+        self._edges = edges
+        self._time_weighted = time_weighted
+        self._weights = [0.0] * (len(edges) + 1)
+        self._open_states: dict[str, HistoryState] = {}
+        self.labels = [
+            f"<{edges[0]:g}",
+            *(f"{low:g}-{high:g}" for low, high in pairwise(edges)),
+            f">={edges[-1]:g}",
+        ]
+
+    def reset(self) -> None:
+        """Empty the histogram."""
+        self._weights = [0.0] * (len(self._edges) + 1)
+        self._open_states = {}
+
+    def _add(self, state: str, weight: float) -> None:
+        """Add a weight to the bin of a state, if it is numeric."""
+        try:
+            value = float(state)
+        except ValueError:
+            # non numeric states are in no bin
+            return
+        self._weights[bisect_right(self._edges, value)] += weight
+
+    def append(self, history_state: HistoryState) -> None:
+        """Count a state that is the latest of its entity."""
+        if not self._time_weighted:
+            self._add(history_state.state, 1)
+            return
+        if (previous := self._open_states.get(history_state.entity_id)) is not None:
+            # The previous state lasted until this one
+            self._add(
+                previous.state, history_state.last_changed - previous.last_changed
+            )
+        self._open_states[history_state.entity_id] = history_state
+
+    def insert(self, buffer: list[HistoryState], index: int, head: int) -> None:
+        """Count a state that was put into the buffer at an index past the head."""
+        history_state = buffer[index]
+        latest = self._open_states.get(history_state.entity_id)
+        if (
+            not self._time_weighted
+            or latest is None
+            or history_state.last_changed >= latest.last_changed
+        ):
+            self.append(history_state)
+            return
+        # The time until the next state of the entity moves from the previous
+        # state of the entity to this one. Both are found by walking out from
+        # the index, which stops at the nearest state of the entity.
+        next_state = latest
+        for state_index in range(index + 1, len(buffer)):
+            if buffer[state_index].entity_id == history_state.entity_id:
+                next_state = buffer[state_index]
+                break
+        previous_state = None
+        for state_index in range(index - 1, head - 1, -1):
+            if buffer[state_index].entity_id == history_state.entity_id:
+                previous_state = buffer[state_index]
+                break
+        duration = next_state.last_changed - history_state.last_changed
+        if previous_state is not None:
+            self._add(previous_state.state, -duration)
+        self._add(history_state.state, duration)
+
+    def expire(self, expired: list[HistoryState], start_timestamp: float) -> None:
+        """
+        Uncount the states before the new start of the period.
+
+        The expired states must be in time order, and the last one of each
+        entity is kept as its state at the start.
+        """
+        previous_states: dict[str, HistoryState] = {}
+        for history_state in expired:
+            if (previous := previous_states.get(history_state.entity_id)) is not None:
+                self._add(
+                    previous.state,
+                    -(history_state.last_changed - previous.last_changed)
+                    if self._time_weighted
+                    else -1,
+                )
+            previous_states[history_state.entity_id] = history_state
+        if not self._time_weighted:
+            return
+        for entity_id, history_state in previous_states.items():
+            # Open states are only counted when read, from their new timestamp
+            if self._open_states.get(entity_id) is not history_state:
+                self._add(
+                    history_state.state, -(start_timestamp - history_state.last_changed)
+                )
+
+    def weights(self, until_timestamp: float) -> list[float]:
+        """Return the weight of each bin, as counts or hours."""
+        if not self._time_weighted:
+            return list(self._weights)
+        weights = list(self._weights)
+        for history_state in self._open_states.values():
+            try:
+                value = float(history_state.state)
+            except ValueError:
+                continue
+            weights[bisect_right(self._edges, value)] += max(
+                until_timestamp - history_state.last_changed, 0
+            )
+        return [weight / SECONDS_PER_HOUR for weight in weights]
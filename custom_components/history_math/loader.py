@@ -0,0 +1,87 @@
+"""Schedule the initial history loads of the history_math sensors."""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import logging
+import math
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from datetime import timedelta
+from itertools import count
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.start import async_at_started
+from homeassistant.util.hass_dict import HassKey
+
+from .const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+DATA_LOADER: HassKey[HistoryMathLoader] = HassKey(f"{DOMAIN}_loader")
+
+# Windows at least this long are not loaded until Home Assistant has started
+LONG_WINDOW = timedelta(days=1)
+
+
+class HistoryMathLoader:
+    """Limit and order the initial history loads."""
+
+    def __init__(self, hass: HomeAssistant, max_concurrent_loads: int) -> None:
+        """Init the loader."""
+        self._max_concurrent_loads = max_concurrent_loads
+        self._active_loads = 0
+        self._waiting: list[tuple[tuple[bool, float], int, asyncio.Future[None]]] = []
+        self._sequence = count()
+        self._started = asyncio.Event()
+        async_at_started(hass, self._async_started)
+
+    @callback
+    def _async_started(self, _: HomeAssistant) -> None:
+        """Release the deferred loads once Home Assistant has started."""
+        self._started.set()
+
+    @asynccontextmanager
+    async def async_load_slot(
+        self, name: str, window: timedelta | None, *, visible: bool
+    ) -> AsyncIterator[None]:
+        """Wait for a turn to load the history of a window."""
+        # Windows that cannot be worked out are treated as the longest
+        seconds = window.total_seconds() if window is not None else math.inf
+        if seconds >= LONG_WINDOW.total_seconds() and not self._started.is_set():
+            _LOGGER.debug("Deferring load of %s until started", name)
+            await self._started.wait()
+
+        # Visible sensors first, then the shortest windows
+        await self._async_acquire((not visible, seconds))
+        _LOGGER.debug("Loading %s", name)
+        try:
+            yield
+        finally:
+            self._async_release()
+
+    async def _async_acquire(self, priority: tuple[bool, float]) -> None:
+        """Acquire a load slot, waiting in priority order if none are free."""
+        if self._active_loads < self._max_concurrent_loads and not self._waiting:
+            self._active_loads += 1
+            return
+        future: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiting, (priority, next(self._sequence), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was handed over just as we were cancelled
+                self._async_release()
+            raise
+
+    @callback
+    def _async_release(self) -> None:
+        """Hand the load slot to the next waiting load, if any."""
+        while self._waiting:
+            _, _, future = heapq.heappop(self._waiting)
+            if not future.done():
+                future.set_result(None)
+                return
+        self._active_loads -= 1
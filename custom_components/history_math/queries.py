@@ -0,0 +1,235 @@
+"""Narrow recorder queries for the history_math component."""
+
+from __future__ import annotations
+
+import logging
+from typing import Any
+
+from homeassistant.components.recorder import Recorder, get_instance
+from homeassistant.components.recorder.db_schema import StateAttributes, States
+from homeassistant.const import STATE_UNKNOWN
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.recorder import session_scope
+from homeassistant.util.collection import chunked_or_all
+from homeassistant.util.json import json_loads_object
+from sqlalchemy import ColumnElement, Select, and_, func, select
+from sqlalchemy.orm import Session
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def state_changes_during_period(
+    hass: HomeAssistant,
+    start_ts: float,
+    end_ts: float,
+    entity_ids: list[str],
+    session: Session | None = None,
+) -> dict[str, list[tuple[str, float]]]:
+    """
+    Return the state changes of each entity during a period, oldest first.
+
+    Like the recorder's state_changes_during_period with
+    include_start_time_state=True, the state at the start of the period is
+    returned with the start timestamp, but all entities are fetched at once.
+    The recorder's session is used unless a session is given.
+    """
+    instance = get_instance(hass)
+    with session_scope(hass=hass, session=session, read_only=True) as read_session:
+        if not (metadata_ids := _metadata_ids(instance, read_session, entity_ids)):
+            return {}
+        changes: dict[str, list[tuple[str, float]]] = {
+            entity_id: [] for entity_id in metadata_ids.values()
+        }
+        for row in read_session.execute(
+            _start_time_stmt(
+                (States.metadata_id, States.state), list(metadata_ids), start_ts
+            )
+        ):
+            changes[metadata_ids[row.metadata_id]].append((row.state, start_ts))
+        for row in read_session.execute(
+            _during_period_stmt(
+                (States.metadata_id, States.state, States.last_updated_ts),
+                list(metadata_ids),
+                start_ts,
+                end_ts,
+            ).where(
+                (States.last_changed_ts == States.last_updated_ts)
+                | States.last_changed_ts.is_(None)
+            )
+        ):
+            changes[metadata_ids[row.metadata_id]].append(
+                (row.state, row.last_updated_ts)
+            )
+    return changes
+
+
+def attribute_changes_during_period(
+    hass: HomeAssistant,
+    start_ts: float,
+    end_ts: float,
+    entity_ids: list[str],
+    attribute: str,
+    session: Session | None = None,
+) -> dict[str, list[tuple[str, float]]]:
+    """
+    Return the changes of an attribute of each entity during a period, oldest first.
+
+    Like state_changes_during_period, the value at the start of the period is
+    returned with the start timestamp. Only the attributes_id of each row is
+    fetched, each distinct shared attributes blob is then loaded and decoded
+    once. Rows that leave the attribute unchanged are dropped.
+    """
+    instance = get_instance(hass)
+    columns = (States.metadata_id, States.attributes_id, States.attributes)
+    with session_scope(hass=hass, session=session, read_only=True) as read_session:
+        if not (metadata_ids := _metadata_ids(instance, read_session, entity_ids)):
+            return {}
+        changes: dict[str, list[tuple[int | None, str | None, float]]] = {
+            entity_id: [] for entity_id in metadata_ids.values()
+        }
+        for row in read_session.execute(
+            _start_time_stmt(columns, list(metadata_ids), start_ts)
+        ):
+            changes[metadata_ids[row.metadata_id]].append(
+                (row.attributes_id, row.attributes, start_ts)
+            )
+        for row in read_session.execute(
+            _during_period_stmt(
+                (*columns, States.last_updated_ts),
+                list(metadata_ids),
+                start_ts,
+                end_ts,
+            )
+        ):
+            entity_changes = changes[metadata_ids[row.metadata_id]]
+            # Consecutive rows sharing an attributes_id only changed the state
+            if (
+                row.attributes_id is not None
+                and entity_changes
+                and row.attributes_id == entity_changes[-1][0]
+            ):
+                continue
+            entity_changes.append(
+                (row.attributes_id, row.attributes, row.last_updated_ts)
+            )
+
+        values = _attribute_values(
+            read_session,
+            {
+                attributes_id
+                for entity_changes in changes.values()
+                for attributes_id, _, _ in entity_changes
+                if attributes_id
+            },
+            attribute,
+            instance.max_bind_vars,
+        )
+
+    attribute_changes: dict[str, list[tuple[str, float]]] = {}
+    for entity_id, entity_changes in changes.items():
+        entity_values = attribute_changes[entity_id] = []
+        for attributes_id, legacy_attributes, last_updated_ts in entity_changes:
+            value = (
+                values[attributes_id]
+                if attributes_id
+                else _attribute_value(legacy_attributes, attribute)
+            )
+            # Like the live events, rows where only other attributes changed
+            # are not a change of the attribute
+            if entity_values and entity_values[-1][0] == value:
+                continue
+            entity_values.append((value, last_updated_ts))
+    return attribute_changes
+
+
+def _metadata_ids(
+    instance: Recorder, session: Session, entity_ids: list[str]
+) -> dict[int, str]:
+    """Resolve the entity ids known to the recorder to their metadata_id."""
+    metadata_ids = instance.states_meta_manager.get_many(
+        entity_ids, session, from_recorder=False
+    )
+    return {
+        metadata_id: entity_id
+        for entity_id, metadata_id in metadata_ids.items()
+        if metadata_id is not None
+    }
+
+
+def _start_time_stmt(
+    columns: tuple[ColumnElement, ...], metadata_ids: list[int], start_ts: float
+) -> Select:
+    """Return the last row of each entity before the start of the period."""
+    latest = (
+        select(
+            States.metadata_id.label("latest_metadata_id"),
+            func.max(States.last_updated_ts).label("latest_last_updated_ts"),
+        )
+        .where(States.metadata_id.in_(metadata_ids), States.last_updated_ts < start_ts)
+        .group_by(States.metadata_id)
+        .subquery()
+    )
+    return (
+        select(*columns)
+        .select_from(States)
+        .join(
+            latest,
+            and_(
+                States.metadata_id == latest.c.latest_metadata_id,
+                States.last_updated_ts == latest.c.latest_last_updated_ts,
+            ),
+        )
+    )
+
+
+def _during_period_stmt(
+    columns: tuple[ColumnElement, ...],
+    metadata_ids: list[int],
+    start_ts: float,
+    end_ts: float,
+) -> Select:
+    """Return the rows of each entity during the period, grouped by entity."""
+    return (
+        select(*columns)
+        .where(
+            States.metadata_id.in_(metadata_ids),
+            States.last_updated_ts > start_ts,
+            States.last_updated_ts < end_ts,
+        )
+        .order_by(States.metadata_id, States.last_updated_ts)
+    )
+
+
+def _attribute_values(
+    session: Session,
+    attributes_ids: set[int],
+    attribute: str,
+    max_bind_vars: int,
+) -> dict[int, str]:
+    """Load and decode each shared attributes blob once."""
+    values: dict[int, str] = {}
+    for attributes_ids_chunk in chunked_or_all(attributes_ids, max_bind_vars):
+        for attributes_id, shared_attrs in session.execute(
+            select(StateAttributes.attributes_id, StateAttributes.shared_attrs).where(
+                StateAttributes.attributes_id.in_(attributes_ids_chunk)
+            )
+        ):
+            values[attributes_id] = _attribute_value(shared_attrs, attribute)
+    # Rows whose attributes were purged have no value
+    for attributes_id in attributes_ids - values.keys():
+        values[attributes_id] = STATE_UNKNOWN
+    return values
+
+
+def _attribute_value(source: str | None, attribute: str) -> str:
+    """Decode a single attribute from a JSON attributes blob."""
+    if not source:
+        return STATE_UNKNOWN
+    try:
+        attributes: dict[str, Any] = json_loads_object(source)
+    except ValueError:
+        _LOGGER.exception("Error converting row to state attributes: %s", source)
+        return STATE_UNKNOWN
+    if (value := attributes.get(attribute)) is None:
+        return STATE_UNKNOWN
+    return str(value)
@@ -0,0 +1,120 @@
+"""Run the history_math recorder queries."""
+
+from __future__ import annotations
+
+import logging
+import threading
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from homeassistant.components.recorder import get_instance
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP
+from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.util.hass_dict import HassKey
+from sqlalchemy import URL, Engine, create_engine, event, make_url
+from sqlalchemy.orm import Session, sessionmaker
+
+from .const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+DATA_READER: HassKey[HistoryMathReader] = HassKey(f"{DOMAIN}_reader")
+
+# Statements making every transaction on a connection read only
+READ_ONLY_STATEMENTS = {
+    "sqlite": "PRAGMA query_only = ON",
+    "mysql": "SET SESSION TRANSACTION READ ONLY",
+    "postgresql": "SET SESSION CHARACTERISTICS AS TRANSACTION READ ONLY",
+}
+
+
+class HistoryMathReader:
+    """Run queries on the recorder, or on a dedicated read only connection pool."""
+
+    def __init__(self, hass: HomeAssistant, pool_size: int) -> None:
+        """Init the reader."""
+        self._hass = hass
+        self._pool_size = pool_size
+        self._url: URL | None = None
+        self._executor: ThreadPoolExecutor | None = None
+        self._engine: Engine | None = None
+        self._session_factory: sessionmaker[Session] | None = None
+        self._lock = threading.Lock()
+
+        if not pool_size:
+            return
+        if (url := self._read_only_url(get_instance(hass).db_url)) is None:
+            _LOGGER.warning(
+                "A read only connection pool is not supported for this database,"
+                " history will be read through the recorder"
+            )
+            return
+        self._url = url
+        self._executor = ThreadPoolExecutor(
+            max_workers=pool_size, thread_name_prefix=f"{DOMAIN}_reader"
+        )
+        hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, self._async_shutdown)
+
+    @staticmethod
+    def _read_only_url(db_url: str) -> URL | None:
+        """Return the URL to open read only connections to the database."""
+        url = make_url(db_url)
+        if url.get_backend_name() not in READ_ONLY_STATEMENTS:
+            return None
+        if url.get_backend_name() != "sqlite":
+            return url
+        if not url.database or url.database == ":memory:":
+            # A private in memory database cannot be shared
+            return None
+        # The recorder keeps SQLite in WAL mode, so readers never block its commits
+        return url.set(
+            database=f"file:{url.database}", query={"mode": "ro", "uri": "true"}
+        )
+
+    async def async_add_executor_job[_T](
+        self, target: Callable[..., _T], *args: Any
+    ) -> _T:
+        """Run a query, which must accept a session keyword argument."""
+        if self._executor is None:
+            return await get_instance(self._hass).async_add_executor_job(target, *args)
+        return await self._hass.loop.run_in_executor(
+            self._executor, self._run_with_session, target, *args
+        )
+
+    def _run_with_session[_T](self, target: Callable[..., _T], *args: Any) -> _T:
+        """Run a query with a session from the read only pool."""
+        return target(*args, session=self._get_session_factory()())
+
+    def _get_session_factory(self) -> sessionmaker[Session]:
+        """Return the session factory, creating the engine on first use."""
+        with self._lock:
+            if self._session_factory is None:
+                assert self._url is not None
+                self._engine = create_engine(
+                    self._url,
+                    pool_size=self._pool_size,
+                    max_overflow=0,
+                    pool_pre_ping=True,
+                )
+                statement = READ_ONLY_STATEMENTS[self._url.get_backend_name()]
+
+                @event.listens_for(self._engine, "connect")
+                def _set_read_only(dbapi_connection: Any, _: Any) -> None:
+                    """Make the new connection read only."""
+                    cursor = dbapi_connection.cursor()
+                    cursor.execute(statement)
+                    cursor.close()
+
+                self._session_factory = sessionmaker(bind=self._engine)
+            return self._session_factory
+
+    @callback
+    def _async_shutdown(self, _: Event) -> None:
+        """Stop the read only pool."""
+        assert self._executor is not None
+        # Refreshes during the rest of the shutdown go through the recorder
+        executor, self._executor = self._executor, None
+        executor.shutdown(wait=False, cancel_futures=True)
+        if self._engine is not None:
+            self._hass.async_add_executor_job(self._engine.dispose)
@@ -16,14 +16,15 @@ from homeassistant.components.sensor import (
     SensorStateClass,
 )
 from homeassistant.const import (
+    CONF_ATTRIBUTE,
     CONF_ENTITY_ID,
     CONF_NAME,
     CONF_TYPE,
     CONF_UNIQUE_ID,
     CONF_UNIT_OF_MEASUREMENT,
+    UnitOfTime,
 )
 from homeassistant.core import HomeAssistant, callback
-from homeassistant.exceptions import PlatformNotReady
 from homeassistant.helpers.device import async_device_info_to_link_from_entity
 from homeassistant.helpers.entity import get_unit_of_measurement
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
@@ -34,10 +35,18 @@ from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
 from . import HistoryMathConfigEntry
 from .const import (
+    ATTR_BINS,
+    ATTR_LOADING,
+    CONF_BINS,
     CONF_DURATION,
     CONF_END,
+    CONF_GROUP_BY,
+    CONF_GROUP_BY_KEYS,
+    CONF_GROUP_BY_VALUE,
     CONF_PERIOD_KEYS,
     CONF_START,
+    CONF_TIME_WEIGHTED,
+    CONF_TYPE_HISTOGRAM,
     CONF_TYPE_KEYS,
     CONF_TYPE_MAX,
     DEFAULT_NAME,
@@ -46,6 +55,7 @@ from .const import (
 )
 from .coordinator import HistoryMathUpdateCoordinator
 from .data import HistoryMath
+from .helpers import is_glob, parse_bins
 
 ICON = "mdi:chart-line"
 
@@ -59,10 +69,35 @@ def exactly_two_period_keys[_T: dict[str, Any]](conf: _T) -> _T:
     return conf
 
 
+def histogram_bins[_T: dict[str, Any]](conf: _T) -> _T:
+    """Ensure a histogram has increasing bin edges."""
+    if conf[CONF_TYPE] != CONF_TYPE_HISTOGRAM:
+        return conf
+    try:
+        conf[CONF_BINS] = parse_bins(conf.get(CONF_BINS, []))
+    except ValueError as ex:
+        raise vol.Invalid(f"Invalid histogram bins: {ex}") from ex
+    return conf
+
+
+def entity_id_or_glob(value: Any) -> str:
+    """Validate an entity id or a glob pattern matching entity ids."""
+    value = cv.string(value).lower()
+    if not is_glob(value):
+        return cv.entity_id(value)
+    if "." not in value:
+        raise vol.Invalid(f"Glob pattern {value} does not match any entity ids")
+    return value
+
+
 PLATFORM_SCHEMA = vol.All(
     SENSOR_PLATFORM_SCHEMA.extend(
         {
-            vol.Required(CONF_ENTITY_ID): cv.entity_id,
+            vol.Required(CONF_ENTITY_ID): vol.All(cv.ensure_list, [entity_id_or_glob]),
+            vol.Optional(CONF_GROUP_BY, default=CONF_GROUP_BY_VALUE): vol.In(
+                CONF_GROUP_BY_KEYS
+            ),
+            vol.Optional(CONF_ATTRIBUTE): cv.string,
             vol.Optional(CONF_START): cv.template,
             vol.Optional(CONF_END): cv.template,
             vol.Optional(CONF_DURATION): cv.time_period,
@@ -70,9 +105,12 @@ PLATFORM_SCHEMA = vol.All(
             vol.Optional(CONF_NAME, default=DEFAULT_NAME): cv.string,
             vol.Optional(CONF_UNIQUE_ID): cv.string,
             vol.Optional(CONF_UNIT_OF_MEASUREMENT): cv.string,
+            vol.Optional(CONF_BINS): vol.All(cv.ensure_list, [vol.Coerce(float)]),
+            vol.Optional(CONF_TIME_WEIGHTED, default=False): cv.boolean,
         }
     ),
     exactly_two_period_keys,
+    histogram_bins,
 )
 
 
@@ -85,7 +123,7 @@ async def async_setup_platform(
     """Set up the History Stats sensor."""
     await async_setup_reload_service(hass, DOMAIN, PLATFORMS)
 
-    entity_id: str = config[CONF_ENTITY_ID]
+    entity_ids: list[str] = config[CONF_ENTITY_ID]
     start: Template | None = config.get(CONF_START)
     end: Template | None = config.get(CONF_END)
     duration: datetime.timedelta | None = config.get(CONF_DURATION)
@@ -93,12 +131,24 @@ async def async_setup_platform(
     unique_id: str | None = config.get(CONF_UNIQUE_ID)
     sensor_type: str = config[CONF_TYPE]
     unit_of_measurement: str | None = config.get(CONF_UNIT_OF_MEASUREMENT)
+    attribute: str | None = config.get(CONF_ATTRIBUTE)
+    group_by: str = config[CONF_GROUP_BY]
+    bins: list[float] | None = config.get(CONF_BINS)
+    time_weighted: bool = config[CONF_TIME_WEIGHTED]
 
-    history_math = HistoryMath(hass, entity_id, start, end, duration, sensor_type)
+    history_math = HistoryMath(
+        hass,
+        entity_ids,
+        start,
+        end,
+        duration,
+        sensor_type,
+        attribute,
+        group_by,
+        bins if sensor_type == CONF_TYPE_HISTOGRAM else None,
+        time_weighted=time_weighted,
+    )
     coordinator = HistoryMathUpdateCoordinator(hass, history_math, name)
-    await coordinator.async_refresh()
-    if not coordinator.last_update_success:
-        raise PlatformNotReady from coordinator.last_exception
     async_add_entities(
         [
             HistoryMathSensor(
@@ -106,8 +156,14 @@ async def async_setup_platform(
                 coordinator,
                 name,
                 unique_id,
-                unit_of_measurement,
-                entity_id,
+                _unit_of_measurement(
+                    unit_of_measurement, sensor_type, time_weighted=time_weighted
+                ),
+                # Only a single source entity has a unit and device to share
+                entity_ids[0]
+                if len(entity_ids) == 1 and not is_glob(entity_ids[0])
+                else None,
+                inherit_unit=sensor_type != CONF_TYPE_HISTOGRAM and attribute is None,
             )
         ]
     )
@@ -121,7 +177,12 @@ async def async_setup_entry(
     """Set up the History stats sensor entry."""
     coordinator = entry.runtime_data
     entity_id: str = entry.options[CONF_ENTITY_ID]
-    unit_of_measurement: str | None = entry.options.get(CONF_UNIT_OF_MEASUREMENT)
+    sensor_type: str = entry.options.get(CONF_TYPE, CONF_TYPE_MAX)
+    unit_of_measurement: str | None = _unit_of_measurement(
+        entry.options.get(CONF_UNIT_OF_MEASUREMENT),
+        sensor_type,
+        time_weighted=entry.options.get(CONF_TIME_WEIGHTED, False),
+    )
     async_add_entities(
         [
             HistoryMathSensor(
@@ -131,11 +192,26 @@ async def async_setup_entry(
                 entry.entry_id,
                 unit_of_measurement,
                 entity_id,
+                inherit_unit=sensor_type != CONF_TYPE_HISTOGRAM
+                and entry.options.get(CONF_ATTRIBUTE) is None,
             )
         ]
     )
 
 
+def _unit_of_measurement(
+    unit_of_measurement: str | None, sensor_type: str, *, time_weighted: bool
+) -> str | None:
+    """Return the configured unit, or hours for a time weighted histogram."""
+    if (
+        unit_of_measurement is None
+        and sensor_type == CONF_TYPE_HISTOGRAM
+        and time_weighted
+    ):
+        return UnitOfTime.HOURS
+    return unit_of_measurement
+
+
 class HistoryMathSensorBase(
     CoordinatorEntity[HistoryMathUpdateCoordinator], SensorEntity
 ):
@@ -156,6 +232,12 @@ class HistoryMathSensorBase(
         """Entity has been added to hass."""
         await super().async_added_to_hass()
         self.async_on_remove(self.coordinator.async_setup_state_listener())
+        self.async_on_remove(
+            self.coordinator.async_schedule_initial_load(
+                visible=self.registry_entry is None
+                or self.registry_entry.hidden_by is None
+            )
+        )
 
     def _handle_coordinator_update(self) -> None:
         """Set attrs from value and count."""
@@ -180,27 +262,38 @@ class HistoryMathSensor(HistoryMathSensorBase):
         name: str,
         unique_id: str | None,
         unit_of_measurement: str | None,
-        source_entity_id: str,
+        source_entity_id: str | None,
+        *,
+        inherit_unit: bool,
     ) -> None:
         """Initialize the HistoryMath sensor."""
         super().__init__(coordinator, name)
+        # Histograms and attributes do not share the unit of the source state
         self._attr_native_unit_of_measurement = (
             unit_of_measurement
             if unit_of_measurement is not None
+            or source_entity_id is None
+            or not inherit_unit
             else get_unit_of_measurement(
                 hass,
                 source_entity_id,
             )
         )
         self._attr_unique_id = unique_id
-        self._attr_device_info = async_device_info_to_link_from_entity(
-            hass,
-            source_entity_id,
-        )
+        if source_entity_id is not None:
+            self._attr_device_info = async_device_info_to_link_from_entity(
+                hass,
+                source_entity_id,
+            )
         self._process_update()
 
     @callback
     def _process_update(self) -> None:
         """Process an update from the coordinator."""
         state = self.coordinator.data
-        self._attr_native_value = state.calc_value
+        self._attr_native_value = state.calc_value if state is not None else None
+        self._attr_extra_state_attributes = (
+            {ATTR_LOADING: True} if self.coordinator.loading else {}
+        )
+        if state is not None and state.bins is not None:
+            self._attr_extra_state_attributes[ATTR_BINS] = state.bins